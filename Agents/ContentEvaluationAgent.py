@@ -6,10 +6,48 @@ import tempfile
 import shutil
 from difflib import SequenceMatcher
 from BaseAgent import BaseAgent
+from repo_index import RepoIndex
+
+# Patterns are compiled once at import rather than looked up per call
+_HEADER_RE = re.compile(r'^#+\s+(.+)$', re.MULTILINE)
+_PLACEHOLDER_RE = re.compile(
+    r'\b(?:experiment name|lab name|discipline name|write the|add your|enter your|please fill|replace with)\b'
+)
+_CODE_FENCE_RE = re.compile(r'```(?:json)?\s*')
+_JSON_OBJECT_RES = (
+    re.compile(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', re.DOTALL),
+    re.compile(r'\{.*?\}', re.DOTALL)
+)
+# Markdown markup characters stripped before checking for generic text
+_MARKUP_TABLE = str.maketrans('', '', '#*_`-')
 
 class ContentEvaluationAgent(BaseAgent):
     role = "Content Quality Evaluator"
     
+    # Standard experiment files, checked in both the template and the lab
+    standard_files = (
+        "README.md", "experiment/aim.md", "experiment/theory.md", 
+        "experiment/procedure.md", "experiment/references.md",
+        "experiment/experiment-name.md", "experiment/contributors.md"
+    )
+    
+    # Strong template indicators; any one marks the file as template content
+    strong_template_patterns = (
+        "write the aim of the experiment here",
+        "write the theory required for this experiment",
+        "explain the procedure to be followed",
+        "add references in apa format here",
+        "experiment name",
+        "discipline name",
+        "lab name"
+    )
+    # Weak template indicators; two or more mark the file as template content
+    weak_template_patterns = ("add your", "enter your", "please fill", "replace with", "todo", "to-do")
+    
+    generic_terms = ("experiment", "lab", "virtual", "simulation", "test", "demo")
+    short_files = ('experiment-name.md', 'contributors.md', 'lab-name.md', 'discipline.md')
+    criteria = ("Educational Value", "Completeness", "Accuracy", "Organization", "Clarity")
+    
     # Only for non-template content evaluation
     evaluation_prompt_template = """
 You are an educational content evaluator for Virtual Labs.
@@ -46,16 +84,14 @@ Respond in JSON only:
 }}
 """
     
-    def __init__(self, repo_path, template_repo_url="https://github.com/virtual-labs/ph3-exp-template"):
+    def __init__(self, repo_path, template_repo_url="https://github.com/virtual-labs/ph3-exp-template", repo_index=None):
         self.repo_path = repo_path
+        self.repo_index = repo_index
         self.template_repo_url = template_repo_url
         self.template_cache_dir = None
         self.template_content_cache = {}
         self.template_comparison_enabled = True
         super().__init__(self.role, basic_prompt=self.evaluation_prompt_template, context=None)
-        
-        # Initialize template repository
-        self._initialize_template_repo()
     
     def _initialize_template_repo(self):
         """Initialize and cache template repository"""
@@ -82,20 +118,13 @@ Respond in JSON only:
         if not self.template_cache_dir or not os.path.exists(self.template_cache_dir):
             return
         
-        template_files = [
-            "README.md", "experiment/aim.md", "experiment/theory.md", 
-            "experiment/procedure.md", "experiment/references.md",
-            "experiment/experiment-name.md", "experiment/contributors.md"
-        ]
-        
-        for file_path in template_files:
+        for file_path in self.standard_files:
             full_path = os.path.join(self.template_cache_dir, file_path)
-            if os.path.exists(full_path):
-                try:
-                    with open(full_path, 'r', encoding='utf-8') as f:
-                        self.template_content_cache[file_path] = f.read().strip()
-                except:
-                    continue
+            try:
+                with open(full_path, 'r', encoding='utf-8') as f:
+                    self.template_content_cache[file_path] = f.read().strip()
+            except:
+                continue
         
         experiment_dir = os.path.join(self.template_cache_dir, "experiment")
         if os.path.exists(experiment_dir):
@@ -213,8 +242,8 @@ Respond in JSON only:
     def _compare_markdown_structure(self, content, template_content):
         """Compare markdown structure"""
         try:
-            content_headers = re.findall(r'^#+\s+(.+)$', content, re.MULTILINE)
-            template_headers = re.findall(r'^#+\s+(.+)$', template_content, re.MULTILINE)
+            content_headers = _HEADER_RE.findall(content)
+            template_headers = _HEADER_RE.findall(template_content)
             
             if not template_headers:
                 return 0.5
@@ -229,14 +258,8 @@ Respond in JSON only:
     
     def _count_placeholder_indicators(self, content, template_content):
         """Count placeholder indicators"""
-        template_placeholders = re.findall(
-            r'\b(?:experiment name|lab name|discipline name|write the|add your|enter your|please fill|replace with)\b', 
-            template_content.lower()
-        )
-        content_placeholders = re.findall(
-            r'\b(?:experiment name|lab name|discipline name|write the|add your|enter your|please fill|replace with)\b', 
-            content.lower()
-        )
+        template_placeholders = _PLACEHOLDER_RE.findall(template_content.lower())
+        content_placeholders = _PLACEHOLDER_RE.findall(content.lower())
         
         if not template_placeholders:
             return 0.0
@@ -248,36 +271,22 @@ Respond in JSON only:
         """Pattern-based template detection (fallback)"""
         content_lower = content.lower()
         
-        # Strong template indicators
-        strong_patterns = [
-            "write the aim of the experiment here",
-            "write the theory required for this experiment",
-            "explain the procedure to be followed",
-            "add references in apa format here",
-            "experiment name",
-            "discipline name",
-            "lab name"
-        ]
-        
         # Check for strong patterns
-        for pattern in strong_patterns:
+        for pattern in self.strong_template_patterns:
             if pattern in content_lower:
                 return True
         
         # Check for multiple weak patterns
-        weak_patterns = ["add your", "enter your", "please fill", "replace with", "todo", "to-do"]
-        weak_count = sum(1 for pattern in weak_patterns if pattern in content_lower)
+        weak_count = sum(1 for pattern in self.weak_template_patterns if pattern in content_lower)
         
         return weak_count >= 2
     
     def _is_generic_short_content(self, content):
         """Check if short content is generic"""
-        content_clean = re.sub(r'[#*_`-]', '', content).strip().lower()
-        generic_terms = ["experiment", "lab", "virtual", "simulation", "test", "demo"]
-        
+        content_clean = content.translate(_MARKUP_TABLE).strip().lower()
         words = content_clean.split()
         if len(words) <= 3:
-            return any(term in content_clean for term in generic_terms)
+            return any(term in content_clean for term in self.generic_terms)
         
         return False
     
@@ -286,37 +295,33 @@ Respond in JSON only:
         if not content:
             return True
         
-        short_files = ['experiment-name.md', 'contributors.md', 'lab-name.md', 'discipline.md']
         file_name = os.path.basename(file_path).lower()
         
-        if any(short_file in file_name for short_file in short_files):
+        if any(short_file in file_name for short_file in self.short_files):
             return True
         
         word_count = len(content.split())
         return word_count < 20
     
+    def _index(self):
+        if self.repo_index is None:
+            self.repo_index = RepoIndex(self.repo_path)
+        return self.repo_index
+    
     def _read_file_content(self, file_path):
-        full_path = os.path.join(self.repo_path, file_path)
-        if not os.path.exists(full_path):
-            return None
-        try:
-            with open(full_path, 'r', encoding='utf-8') as file:
-                return file.read().strip() or None
-        except:
+        content = self._index().read(file_path)
+        if content is None:
             return None
+        return content.strip() or None
     
     def _extract_json_from_response(self, text):
         if not text:
             return None
         
-        text = re.sub(r'```json\s*', '', text)
-        text = re.sub(r'```\s*', '', text)
-        text = text.strip()
+        text = _CODE_FENCE_RE.sub('', text).strip()
         
-        patterns = [r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', r'\{.*?\}']
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.DOTALL)
+        for pattern in _JSON_OBJECT_RES:
+            matches = pattern.findall(text)
             for match in matches:
                 try:
                     parsed = json.loads(match)
@@ -326,6 +331,9 @@ Respond in JSON only:
                     continue
         return None
     
+    def _is_usable_output(self, text):
+        return self._validate_scores(self._extract_json_from_response(text)) is not None
+
     def _validate_scores(self, json_data):
         if not isinstance(json_data, dict) or 'scores' not in json_data:
             return None
@@ -334,7 +342,7 @@ Respond in JSON only:
         if not isinstance(scores, dict):
             return None
         
-        criteria = ["Educational Value", "Completeness", "Accuracy", "Organization", "Clarity"]
+        criteria = self.criteria
         valid_scores = {}
         
         for criterion in criteria:
@@ -360,10 +368,18 @@ Respond in JSON only:
             "feedback": json_data.get('feedback', 'Evaluation completed')
         }
     
-    def _evaluate_single_file(self, file_path):
-        """Evaluate a single content file"""
-        content = self._read_file_content(file_path)
-        
+    def _screen_file(self, file_path, content):
+        """
+        Score a file without the LLM where possible.
+
+        Args:
+            file_path (str): Path relative to the repository root
+            content (str): File contents from _read_file_content
+
+        Returns:
+            tuple: (evaluation, content, similarity_score); evaluation is None
+                when the file needs a full LLM evaluation
+        """
         if not content:
             return {
                 "file": file_path,
@@ -375,7 +391,7 @@ Respond in JSON only:
                 "is_short_content": False,
                 "template_similarity": 0,
                 "feedback": "File could not be read"
-            }
+            }, content, 0
         
         # Step 1: Template detection (no LLM needed)
         is_template, similarity_score, detection_reason = self._is_template_content(file_path, content)
@@ -393,7 +409,7 @@ Respond in JSON only:
                 "is_short_content": is_short,
                 "template_similarity": similarity_score,
                 "feedback": f"Template content detected: {detection_reason}"
-            }
+            }, content, similarity_score
         
         elif is_short:
             # Short genuine content - simple scoring
@@ -406,52 +422,98 @@ Respond in JSON only:
                 "is_short_content": True,
                 "template_similarity": similarity_score,
                 "feedback": "Short genuine content - basic scoring applied"
-            }
+            }, content, similarity_score
         
-        else:
-            # Non-template substantial content - full LLM evaluation
-            return self._evaluate_with_llm(file_path, content, similarity_score)
+        # Non-template substantial content - full LLM evaluation
+        return None, content, similarity_score
     
-    def _evaluate_with_llm(self, file_path, content, similarity_score):
-        """Evaluate substantial non-template content with LLM"""
+    def _evaluate_single_file(self, file_path):
+        """Evaluate a single content file"""
+        evaluation, content, similarity_score = self._screen_file(
+            file_path, self._read_file_content(file_path)
+        )
+        if evaluation is None:
+            evaluation = self._evaluate_with_llm(file_path, content, similarity_score)
+        return evaluation
+    
+    def _evaluation_prompt(self, file_path, content, attempt):
+        """Build the evaluation prompt; retries use a shorter prompt"""
         content_preview = content[:2500] + "..." if len(content) > 2500 else content
         
-        for attempt in range(2):
+        if attempt == 0:
+            return self.evaluation_prompt_template.format(
+                file_name=file_path,
+                content=content_preview
+            )
+        return f"Evaluate educational content: {file_path}\n{content_preview[:1500]}\nJSON with scores, average_score, feedback required."
+    
+    def _parse_llm_evaluation(self, file_path, response, similarity_score):
+        """Turn an LLM response into an evaluation, or None if it is unusable"""
+        json_data = self._extract_json_from_response(response)
+        if json_data:
+            validated_data = self._validate_scores(json_data)
+            if validated_data:
+                return {
+                    "file": file_path,
+                    "status": "Evaluated",
+                    "is_template": False,
+                    "is_short_content": False,
+                    "template_similarity": similarity_score,
+                    **validated_data
+                }
+        return None
+    
+    def _evaluate_with_llm(self, file_path, content, similarity_score, first_attempt=0):
+        """Evaluate substantial non-template content with LLM"""
+        for attempt in range(first_attempt, 2):
             try:
-                if attempt == 0:
-                    prompt = self.evaluation_prompt_template.format(
-                        file_name=file_path,
-                        content=content_preview
-                    )
-                else:
-                    prompt = f"Evaluate educational content: {file_path}\n{content_preview[:1500]}\nJSON with scores, average_score, feedback required."
-                
-                self.context = prompt
+                self.context = self._evaluation_prompt(file_path, content, attempt)
                 response = super().get_output()
                 
-                json_data = self._extract_json_from_response(response)
-                if json_data:
-                    validated_data = self._validate_scores(json_data)
-                    if validated_data:
-                        return {
-                            "file": file_path,
-                            "status": "Evaluated",
-                            "is_template": False,
-                            "is_short_content": False,
-                            "template_similarity": similarity_score,
-                            **validated_data
-                        }
-                
-                if attempt == 0:
-                    continue
+                evaluation = self._parse_llm_evaluation(file_path, response, similarity_score)
+                if evaluation:
+                    return evaluation
                     
             except Exception as e:
-                if attempt == 0:
-                    continue
+                continue
         
         # LLM failed - use rule-based scoring for non-template content
         return self._rule_based_scoring(file_path, content, similarity_score)
     
+    def _evaluate_with_llm_batch(self, pending):
+        """
+        Evaluate several files with one batched LLM call for the first attempt.
+
+        Args:
+            pending (dict): file path -> (content, similarity_score)
+
+        Returns:
+            dict: file path -> evaluation
+        """
+        contexts = [
+            self._evaluation_prompt(file_path, content, 0)
+            for file_path, (content, _) in pending.items()
+        ]
+        
+        try:
+            responses = self.get_outputs(contexts)
+        except Exception as e:
+            responses = [e] * len(contexts)
+        
+        evaluations = {}
+        for (file_path, (content, similarity_score)), response in zip(pending.items(), responses):
+            evaluation = None
+            if not isinstance(response, Exception):
+                evaluation = self._parse_llm_evaluation(file_path, response, similarity_score)
+            
+            if evaluation is None:
+                # Retry this file on its own with the shorter prompt
+                evaluation = self._evaluate_with_llm(file_path, content, similarity_score, first_attempt=1)
+            
+            evaluations[file_path] = evaluation
+        
+        return evaluations
+    
     def _rule_based_scoring(self, file_path, content, similarity_score):
         """Rule-based scoring for non-template content when LLM fails"""
         word_count = len(content.split())
@@ -497,37 +559,17 @@ Respond in JSON only:
         }
     
     def _find_content_files(self):
-        content_files = []
-        
-        priority_files = [
-            "README.md", "experiment/aim.md", "experiment/theory.md", 
-            "experiment/procedure.md", "experiment/references.md",
-            "experiment/experiment-name.md", "experiment/contributors.md"
-        ]
-        
-        for file_path in priority_files:
-            full_path = os.path.join(self.repo_path, file_path)
-            if os.path.exists(full_path) and os.path.isfile(full_path):
-                content_files.append(file_path)
-        
-        experiment_dir = os.path.join(self.repo_path, "experiment")
-        if os.path.exists(experiment_dir):
-            for root, dirs, files in os.walk(experiment_dir):
-                for file in files:
-                    if file.lower().endswith('.md'):
-                        relative_path = os.path.relpath(os.path.join(root, file), self.repo_path)
-                        
-                        parts = os.path.normpath(relative_path).split(os.sep)
-                        if 'simulation' in parts or 'images' in parts:
-                            continue
-                        
-                        if relative_path not in content_files:
-                            try:
-                                file_size = os.path.getsize(os.path.join(root, file))
-                                if file_size < 1024 * 1024:
-                                    content_files.append(relative_path)
-                            except:
-                                continue
+        index = self._index()
+        content_files = [file_path for file_path in self.standard_files if index.is_file(file_path)]
+        seen = set(content_files)
+        
+        # Simulation and image folders are never looked at
+        for relative_path in index.iter_files("experiment", skip_dirs=('simulation', 'images')):
+            if relative_path.lower().endswith('.md') and relative_path not in seen:
+                size = index.size(relative_path)
+                if size is not None and size < 1024 * 1024:
+                    content_files.append(relative_path)
+                    seen.add(relative_path)
         
         return content_files
     
@@ -547,6 +589,10 @@ Respond in JSON only:
                 "status": "No content files found"
             }
         
+        # Clone the template repository only once there is content to compare
+        if self.template_cache_dir is None and self.template_comparison_enabled:
+            self._initialize_template_repo()
+        
         file_evaluations = {}
         total_score = 0
         evaluated_count = 0
@@ -554,10 +600,19 @@ Respond in JSON only:
         short_content_count = 0
         high_similarity_count = 0
         
+        # Screen every file first so the LLM evaluations go out as one batch
+        pending = {}
         for file_path in content_files:
-            evaluation = self._evaluate_single_file(file_path)
+            content = self._read_file_content(file_path)
+            evaluation, content, similarity_score = self._screen_file(file_path, content)
+            if evaluation is None:
+                pending[file_path] = (content, similarity_score)
             file_evaluations[file_path] = evaluation
-            
+        
+        if pending:
+            file_evaluations.update(self._evaluate_with_llm_batch(pending))
+        
+        for evaluation in file_evaluations.values():
             if evaluation['status'] == "Evaluated":
                 total_score += evaluation['average_score']
                 evaluated_count += 1
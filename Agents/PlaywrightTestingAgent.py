@@ -1,4 +1,5 @@
 import os
+import re
 import json
 import asyncio
 import tempfile
@@ -8,7 +9,13 @@ import socket
 import subprocess
 import tempfile
 from playwright.async_api import async_playwright
+from collections import Counter
 from BaseAgent import BaseAgent
+from repo_index import RepoIndex
+
+# Interactive element tags, counted in a single pass over the HTML
+_INTERACTIVE_TAG_RE = re.compile(r'<(input|button|canvas|form)', re.IGNORECASE)
+_JSON_BLOCK_RE = re.compile(r'\{.*\}', re.DOTALL)
 
 class PlaywrightTestingAgent(BaseAgent):
     role = "Browser Functionality Tester"
@@ -45,8 +52,9 @@ Return a JSON with test scenarios:
 }}
 """
     
-    def __init__(self, repo_path):
+    def __init__(self, repo_path, repo_index=None):
         self.repo_path = repo_path
+        self.repo_index = repo_index
         self.simulation_url = None
         self.test_results = {}
         self.screenshots = {}  # Store screenshots with base64 encoding
@@ -232,38 +240,32 @@ Return a JSON with test scenarios:
             except:
                 pass
     
+    def _index(self):
+        if self.repo_index is None:
+            self.repo_index = RepoIndex(self.repo_path)
+        return self.repo_index
+    
     def _get_simulation_context(self):
         """Get simulation context for AI test planning"""
+        index = self._index()
+        
         # Get experiment name
         experiment_name = "Unknown Experiment"
-        try:
-            name_file = os.path.join(self.repo_path, "experiment", "experiment-name.md")
-            if os.path.exists(name_file):
-                with open(name_file, 'r', encoding='utf-8') as f:
-                    content = f.read().strip()
-                    if content and len(content) > 3:
-                        experiment_name = content.replace('#', '').strip()
-        except:
-            pass
+        content = (index.read("experiment/experiment-name.md") or "").strip()
+        if content and len(content) > 3:
+            experiment_name = content.replace('#', '').strip()
         
         # Get HTML preview
-        html_content = ""
-        html_file = os.path.join(self.repo_path, "experiment", "simulation", "index.html")
-        if os.path.exists(html_file):
-            try:
-                with open(html_file, 'r', encoding='utf-8') as f:
-                    html_content = f.read()[:1000]  # First 1000 chars
-            except:
-                pass
+        html_content = index.read("experiment/simulation/index.html", max_chars=1000) or ""  # First 1000 chars only
         
         # Analyze interactive elements
         interactive_elements = []
         if html_content:
-            import re
-            inputs = len(re.findall(r'<input', html_content, re.IGNORECASE))
-            buttons = len(re.findall(r'<button', html_content, re.IGNORECASE))
-            canvas = len(re.findall(r'<canvas', html_content, re.IGNORECASE))
-            forms = len(re.findall(r'<form', html_content, re.IGNORECASE))
+            tag_counts = Counter(tag.lower() for tag in _INTERACTIVE_TAG_RE.findall(html_content))
+            inputs = tag_counts['input']
+            buttons = tag_counts['button']
+            canvas = tag_counts['canvas']
+            forms = tag_counts['form']
             
             if inputs > 0:
                 interactive_elements.append(f"Inputs ({inputs})")
@@ -277,10 +279,20 @@ Return a JSON with test scenarios:
         return {
             "experiment_name": experiment_name,
             "interactive_elements": ", ".join(interactive_elements) if interactive_elements else "None detected",
-            "js_analysis": "JavaScript files found" if os.path.exists(os.path.join(self.repo_path, "experiment", "simulation", "js")) else "No JavaScript",
+            "js_analysis": "JavaScript files found" if index.is_dir("experiment/simulation/js") else "No JavaScript",
             "html_preview": html_content[:500] if html_content else "No HTML content"
         }
     
+    def _is_usable_output(self, text):
+        json_match = _JSON_BLOCK_RE.search(text)
+        if not json_match:
+            return False
+        try:
+            json.loads(json_match.group(0))
+            return True
+        except ValueError:
+            return False
+    
     def _get_ai_test_plan(self, context):
         """Get AI-generated test plan with fallback for quota issues"""
         try:
@@ -289,8 +301,7 @@ Return a JSON with test scenarios:
             response = super().get_output()
             
             # Extract JSON from response
-            import re
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
+            json_match = _JSON_BLOCK_RE.search(response)
             if json_match:
                 print("✅ AI test plan generated successfully")
                 return json.loads(json_match.group(0))
@@ -1286,8 +1297,7 @@ Return a JSON with test scenarios:
     def get_output(self):
         """Main method to run browser functionality tests with Lighthouse integration"""
         # Check if simulation exists
-        sim_path = os.path.join(self.repo_path, "experiment", "simulation", "index.html")
-        if not os.path.exists(sim_path):
+        if not self._index().is_file("experiment/simulation/index.html"):
             return {
                 "browser_score": 0,
                 "status": "MISSING",
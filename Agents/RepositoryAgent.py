@@ -1,10 +1,26 @@
 import os
-import subprocess
-import tempfile
 import json
 import re
 from BaseAgent import BaseAgent
 
+# Patterns are compiled once at import rather than looked up per call
+_VLAB_URL_RE = re.compile(r'^https://github\.com/virtual-labs/exp-[a-zA-Z0-9\-_]+-[a-zA-Z0-9\-_]+(?:\.git)?/?$')
+_REPO_NAME_RE = re.compile(r'^exp-(.+)-([a-zA-Z0-9]+)$')
+# Heading markers and emphasis characters, stripped in one pass
+_NAME_MARKUP_RE = re.compile(r'^#+\s*|[*_`]', re.MULTILINE)
+_TITLE_RE = re.compile(r'^#\s+(.+)$', re.MULTILINE)
+_TITLE_PREFIX_RE = re.compile(r'^(experiment|lab|virtual lab):\s*', re.IGNORECASE)
+_HEADING_LINE_RE = re.compile(r'^#.*$', re.MULTILINE)
+# List markers (dropped) and Markdown links (replaced by their text), in one pass
+_PARAGRAPH_MARKUP_RE = re.compile(r'^[*-]\s+|\[([^\]]+)\]\([^)]+\)', re.MULTILINE)
+_FENCED_JSON_RE = re.compile(r'```json\s*(.*?)\s*```', re.DOTALL)
+
+
+def _link_text(match):
+    """Keep a Markdown link's text; drop list markers entirely"""
+    return match.group(1) or ''
+
+
 class RepositoryAgent(BaseAgent):
     role = "Repository Analysis Agent"
     
@@ -49,10 +65,7 @@ Return your analysis in JSON format:
         if not url:
             return False, "No URL provided"
         
-        # Define the expected pattern
-        vlab_pattern = r'^https://github\.com/virtual-labs/exp-[a-zA-Z0-9\-_]+-[a-zA-Z0-9\-_]+(?:\.git)?/?$'
-        
-        if re.match(vlab_pattern, url.strip()):
+        if _VLAB_URL_RE.match(url.strip()):
             return True, "Valid Virtual Labs repository URL"
         else:
             return False, "URL does not follow Virtual Labs pattern: https://github.com/virtual-labs/exp-{exp-name}-{inst-name}"
@@ -69,7 +82,7 @@ Return your analysis in JSON format:
         repo_name = clean_url.split('/')[-1]
         
         # Match the pattern exp-{exp-name}-{inst-name}
-        match = re.match(r'^exp-(.+)-([a-zA-Z0-9]+)$', repo_name)
+        match = _REPO_NAME_RE.match(repo_name)
         
         if match:
             exp_name = match.group(1).replace('-', ' ').title()
@@ -82,11 +95,16 @@ Return your analysis in JSON format:
         """Clone the repository to a temporary directory"""
         if not self.repo_url:
             return False, "Repository URL not provided"
-            
+
+        # Only needed when no local checkout was supplied
+        import subprocess
+        import tempfile
+
         self.repo_path = tempfile.mkdtemp()
         
         try:
-            subprocess.check_call(['git', 'clone', self.repo_url, self.repo_path], 
+            # Only the working tree is read, so history is not fetched
+            subprocess.check_call(['git', 'clone', '--depth', '1', self.repo_url, self.repo_path], 
                                  stderr=subprocess.STDOUT)
             return True, self.repo_path
         except subprocess.CalledProcessError as e:
@@ -103,33 +121,30 @@ Return your analysis in JSON format:
         
         # Priority 2: experiment-name.md
         name_file = os.path.join(self.repo_path, "experiment", "experiment-name.md")
-        if os.path.exists(name_file):
-            try:
-                with open(name_file, 'r', encoding='utf-8') as file:
-                    content = file.read().strip()
-                    # Remove markdown formatting
-                    content = re.sub(r'^#+\s*', '', content, flags=re.MULTILINE)
-                    content = re.sub(r'[*_`]', '', content)
-                    if content and len(content.split()) <= 10:  # Reasonable experiment name length
-                        return content.strip()
-            except:
-                pass
+        try:
+            with open(name_file, 'r', encoding='utf-8') as file:
+                content = file.read().strip()
+                # Remove markdown formatting
+                content = _NAME_MARKUP_RE.sub('', content)
+                if content and len(content.split()) <= 10:  # Reasonable experiment name length
+                    return content.strip()
+        except (OSError, UnicodeDecodeError):
+            pass
         
         # Priority 3: Extract from README.md title
         readme_file = os.path.join(self.repo_path, "README.md")
-        if os.path.exists(readme_file):
-            try:
-                with open(readme_file, 'r', encoding='utf-8') as file:
-                    content = file.read()
-                    # Look for the first heading
-                    match = re.search(r'^#\s+(.+)$', content, re.MULTILINE)
-                    if match:
-                        title = match.group(1).strip()
-                        # Clean up common prefixes
-                        title = re.sub(r'^(experiment|lab|virtual lab):\s*', '', title, flags=re.IGNORECASE)
-                        return title
-            except:
-                pass
+        try:
+            with open(readme_file, 'r', encoding='utf-8') as file:
+                content = file.read()
+                # Look for the first heading
+                match = _TITLE_RE.search(content)
+                if match:
+                    title = match.group(1).strip()
+                    # Clean up common prefixes
+                    title = _TITLE_PREFIX_RE.sub('', title)
+                    return title
+        except (OSError, UnicodeDecodeError):
+            pass
         
         # Fallback: Use repo name
         if self.repo_url:
@@ -148,38 +163,44 @@ Return your analysis in JSON format:
         """Extract experiment overview from aim.md or README.md"""
         # Try aim.md first
         aim_file = os.path.join(self.repo_path, "experiment", "aim.md")
-        if os.path.exists(aim_file):
-            try:
-                with open(aim_file, 'r', encoding='utf-8') as file:
-                    content = file.read().strip()
-                    # Remove headings
-                    content = re.sub(r'^#.*$', '', content, flags=re.MULTILINE)
-                    content = content.strip()
-                    if content:
-                        return content[:500]  # First 500 chars
-            except:
-                pass
+        try:
+            with open(aim_file, 'r', encoding='utf-8') as file:
+                content = file.read().strip()
+                # Remove headings
+                content = _HEADING_LINE_RE.sub('', content)
+                content = content.strip()
+                if content:
+                    return content[:500]  # First 500 chars
+        except (OSError, UnicodeDecodeError):
+            pass
                 
         # Try README.md as fallback
         readme_file = os.path.join(self.repo_path, "README.md")
-        if os.path.exists(readme_file):
-            try:
-                with open(readme_file, 'r', encoding='utf-8') as file:
-                    content = file.read()
-                    # Get first paragraph after first heading
-                    paragraphs = content.split('\n\n')
-                    for para in paragraphs[1:]:  # Skip first (usually title)
-                        if para.strip() and not para.strip().startswith('#'):
-                            # Clean up the paragraph
-                            clean_para = re.sub(r'^[*-]\s+', '', para.strip(), flags=re.MULTILINE)
-                            clean_para = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', clean_para)  # Remove links
-                            if len(clean_para) > 50:  # Substantial content
-                                return clean_para[:500]
-            except:
-                pass
+        try:
+            with open(readme_file, 'r', encoding='utf-8') as file:
+                content = file.read()
+                # Get first paragraph after first heading
+                paragraphs = content.split('\n\n')
+                for para in paragraphs[1:]:  # Skip first (usually title)
+                    if para.strip() and not para.strip().startswith('#'):
+                        # Clean up the paragraph
+                        clean_para = _PARAGRAPH_MARKUP_RE.sub(_link_text, para.strip())
+                        if len(clean_para) > 50:  # Substantial content
+                            return clean_para[:500]
+        except (OSError, UnicodeDecodeError):
+            pass
         
         return "No overview available"
     
+    def _is_usable_output(self, text):
+        json_match = _FENCED_JSON_RE.search(text)
+        if not json_match:
+            return False
+        try:
+            return isinstance(json.loads(json_match.group(1)), dict)
+        except ValueError:
+            return False
+    
     def get_output(self):
         """Get repository metadata without structure compliance"""
         if not self.repo_path and self.repo_url:
@@ -214,7 +235,7 @@ Return your analysis in JSON format:
                 response = super().get_output()
                 
                 # Try to extract JSON from response
-                json_match = re.search(r'```json\s*(.*?)\s*```', response, re.DOTALL)
+                json_match = _FENCED_JSON_RE.search(response)
                 if json_match:
                     llm_analysis = json.loads(json_match.group(1))
                     if llm_analysis.get('enhanced_overview'):
@@ -1,10 +1,43 @@
-import os
 import json
-import re
 from BaseAgent import BaseAgent
+from config_loader import load_config
+from repo_index import RepoIndex
+
+# Declaration order is report order: the first few missing are recommended
+_REQUIRED_FILES = (
+    "LICENSE",
+    "README.md",
+    "experiment/aim.md",
+    "experiment/contributors.md",
+    "experiment/experiment-name.md",
+    "experiment/pretest.json",
+    "experiment/posttest.json",
+    "experiment/procedure.md",
+    "experiment/theory.md",
+    "experiment/references.md",
+    "experiment/README.md",
+    "experiment/simulation/index.html",
+    "pedagogy/README.md",
+    "storyboard/README.md"
+)
+
+_REQUIRED_DIRS = (
+    "experiment",
+    "experiment/images",
+    "experiment/simulation",
+    "experiment/simulation/css",
+    "experiment/simulation/js",
+    "pedagogy",
+    "storyboard"
+)
+
+# Build output and vendored code: listed, but never expanded in the structure
+_COLLAPSED_DIRS = frozenset(["dist", "build", "vendor"])
 
 class StructureComplianceAgent(BaseAgent):
     role = "Structure Compliance Evaluator"
+    # The template below is fixed; a prompt-enhancer rewrite adds a call for nothing
+    skip_enhancement = True
     basic_prompt_template = """
     You are an expert in evaluating Virtual Labs repository structure compliance.
     
@@ -47,81 +80,71 @@ class StructureComplianceAgent(BaseAgent):
     ```
     """
     
-    def __init__(self, repo_path):
+    def __init__(self, repo_path, repo_index=None):
         self.repo_path = repo_path
+        # Shared with the other agents when passed in; built on first use otherwise
+        self.repo_index = repo_index
+        self._compliance = None
         super().__init__(
             self.role, 
             basic_prompt=self.basic_prompt_template, 
             context=None
         )
         
-    def _get_repo_structure(self, path, level=0, max_depth=4):
+    def _index(self):
+        if self.repo_index is None:
+            self.repo_index = RepoIndex(self.repo_path)
+        return self.repo_index
+    
+    def _get_repo_structure(self, max_depth=4, max_files=15, max_lines=400):
         """Generate a string representation of the repository structure"""
-        if level > max_depth:
-            return "..."
-        
-        result = ""
-        try:
-            entries = os.listdir(path)
-            for entry in sorted(entries):
-                if entry.startswith('.git') or entry == 'node_modules':
-                    continue
-                
-                entry_path = os.path.join(path, entry)
-                is_dir = os.path.isdir(entry_path)
-                
-                result += "  " * level
-                if is_dir:
-                    result += f"{entry}/\n"
-                    result += self._get_repo_structure(entry_path, level + 1, max_depth)
+        listing = self._index().listings[""]
+        if isinstance(listing, str):
+            return listing
+        
+        lines = []
+        self._format_listing("", 0, max_depth, max_files, max_lines, lines)
+        if len(lines) >= max_lines:
+            lines.append("... (structure truncated)\n")
+        return "".join(lines)
+    
+    def _format_listing(self, relative_dir, level, max_depth, max_files, max_lines, lines):
+        """Append one line per entry of an indexed directory to lines"""
+        listings = self._index().listings
+        shown_files = 0
+        hidden_files = 0
+        for name, is_dir in listings[relative_dir]:
+            if len(lines) >= max_lines:
+                return
+            if is_dir:
+                lines.append("  " * level + f"{name}/\n")
+                relative_path = f"{relative_dir}/{name}" if relative_dir else name
+                expand = level < max_depth and name not in _COLLAPSED_DIRS
+                listing = listings.get(relative_path) if expand else None
+                if listing is None:
+                    # Too deep, build output, or not entered
+                    lines.append("...")
+                elif isinstance(listing, str):
+                    lines.append(listing)
                 else:
-                    result += f"{entry}\n"
-            
-            return result
-        except Exception as e:
-            return f"Error accessing {path}: {str(e)}"
+                    self._format_listing(relative_path, level + 1, max_depth, max_files, max_lines, lines)
+            elif shown_files < max_files:
+                # Directories are always listed; files are capped so large
+                # asset folders do not flood the LLM context
+                lines.append("  " * level + f"{name}\n")
+                shown_files += 1
+            else:
+                hidden_files += 1
+        
+        if hidden_files:
+            lines.append("  " * level + f"... ({hidden_files} more files)\n")
     
     def _check_required_files(self):
         """Check if all required files and directories exist"""
-        required_files = [
-            "LICENSE",
-            "README.md",
-            "experiment/aim.md",
-            "experiment/contributors.md",
-            "experiment/experiment-name.md",
-            "experiment/pretest.json",
-            "experiment/posttest.json",
-            "experiment/procedure.md",
-            "experiment/theory.md",
-            "experiment/references.md",
-            "experiment/README.md",
-            "experiment/simulation/index.html",
-            "pedagogy/README.md",
-            "storyboard/README.md"
-        ]
-        
-        required_dirs = [
-            "experiment",
-            "experiment/images",
-            "experiment/simulation",
-            "experiment/simulation/css",
-            "experiment/simulation/js",
-            "pedagogy",
-            "storyboard"
-        ]
-        
-        missing_files = []
-        missing_dirs = []
-        
-        for file_path in required_files:
-            full_path = os.path.join(self.repo_path, file_path)
-            if not os.path.exists(full_path) or not os.path.isfile(full_path):
-                missing_files.append(file_path)
-        
-        for dir_path in required_dirs:
-            full_path = os.path.join(self.repo_path, dir_path)
-            if not os.path.exists(full_path) or not os.path.isdir(full_path):
-                missing_dirs.append(dir_path)
+        # Presence checks are lookups in the index's path sets, not stat calls
+        index = self._index()
+        missing_files = [f for f in _REQUIRED_FILES if f not in index.files]
+        missing_dirs = [d for d in _REQUIRED_DIRS if d not in index.dirs]
         
         return missing_files, missing_dirs
     
@@ -130,56 +153,50 @@ class StructureComplianceAgent(BaseAgent):
         json_files = ["experiment/pretest.json", "experiment/posttest.json"]
         invalid_json_files = []
         
+        index = self._index()
         for file_path in json_files:
-            full_path = os.path.join(self.repo_path, file_path)
-            if os.path.exists(full_path):
+            if index.is_file(file_path):
                 try:
-                    with open(full_path, 'r', encoding='utf-8') as f:
+                    with open(index.full_path(file_path), 'r', encoding='utf-8') as f:
                         json.load(f)
                 except:
                     invalid_json_files.append(file_path)
         
         return invalid_json_files
         
-    def _extract_json_from_text(self, text):
-        """Extract JSON from text that may contain other content"""
-        json_match = re.search(r'```json\s*(.*?)\s*```', text, re.DOTALL)
-        if json_match:
-            try:
-                return json.loads(json_match.group(1))
-            except:
-                pass
-                
-        # Try finding any JSON object in the text
-        json_pattern = r'(\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\})'
-        match = re.search(json_pattern, text, re.DOTALL)
-        if match:
-            try:
-                return json.loads(match.group(1))
-            except:
-                pass
-        
-        return None
-        
+    def check_compliance(self):
+        """
+        Run the deterministic checks, without the LLM.
+
+        Returns:
+            tuple: (missing_files, missing_dirs, invalid_json_files, compliance_score)
+        """
+        if self._compliance is None:
+            missing_files, missing_dirs = self._check_required_files()
+            invalid_json_files = self._check_json_validity()
+
+            # Calculate compliance score based on missing files and directories
+            total_required = len(_REQUIRED_FILES) + len(_REQUIRED_DIRS)
+            missing_count = len(missing_files) + len(missing_dirs) + len(invalid_json_files)
+            compliance_score = max(0, min(10, 10 * (1 - (missing_count / total_required))))
+            self._compliance = (missing_files, missing_dirs, invalid_json_files, compliance_score)
+        return self._compliance
+
     def get_output(self):
-        repo_structure = self._get_repo_structure(self.repo_path)
-        missing_files, missing_dirs = self._check_required_files()
-        invalid_json_files = self._check_json_validity()
-        
-        # Calculate compliance score based on missing files and directories
-        total_required = 14 + 7  # Files + Dirs
-        missing_count = len(missing_files) + len(missing_dirs) + len(invalid_json_files)
-        compliance_score = max(0, min(10, 10 * (1 - (missing_count / total_required))))
-        
-        # Set context with repo structure
-        self.context = f"Repository Structure:\n{repo_structure}"
+        missing_files, missing_dirs, invalid_json_files, compliance_score = self.check_compliance()
         
-        # Get AI evaluation using the parent class method
-        prompt = self.basic_prompt_template.format(repo_structure=repo_structure)
-        ai_evaluation = super().get_output()
-        
-        # Try to extract JSON from the AI evaluation
-        json_data = self._extract_json_from_text(ai_evaluation)
+        # The score comes from the deterministic checks alone, so a repository
+        # that already falls below the pipeline's minimum is not sent to the LLM
+        json_data = None
+        if compliance_score >= load_config()["thresholds"]["structure_minimum"]:
+            # Set context with repo structure
+            self.context = f"Repository Structure:\n{self._get_repo_structure()}"
+            
+            # Get AI evaluation using the parent class method
+            ai_evaluation = super().get_output()
+            
+            # Try to extract JSON from the AI evaluation
+            json_data = self._extract_json_from_text(ai_evaluation)
         
         # Default recommendations
         recommendations = [
@@ -1,15 +1,24 @@
+import json
+import re
 import dotenv
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
 from langchain_google_genai import ChatGoogleGenerativeAI
+import llm_cache
 
 dotenv.load_dotenv()
 
+# Shared by every agent that pulls JSON out of an LLM response
+_FENCED_JSON_RE = re.compile(r'```json\s*(.*?)\s*```', re.DOTALL)
+_JSON_DECODER = json.JSONDecoder()
+
 
 class BaseAgent:
     llm = None
     prompt_enhancer_llm = None
     enhanced_prompt = None
+    # Extra keyword arguments passed to the LLM on every get_output call
+    llm_kwargs = None
 
     def __init__(self, role: str, basic_prompt: str, context: str = ""):
         self.role = role
@@ -54,7 +63,8 @@ class BaseAgent:
         self.enhanced_prompt = enhanced_prompt['text']
         return self.enhanced_prompt
 
-    def get_output(self):
+    def _build_chain(self):
+        """Build the task chain and pick the prompt it should run with"""
         if not self.llm:
             raise ValueError("LLM is not set.")
 
@@ -73,13 +83,109 @@ class BaseAgent:
             template=final_prompt_template
         )
 
-        chain = LLMChain(llm=self.llm, prompt=prompt)
-        return chain.invoke({
+        chain = LLMChain(llm=self.llm, prompt=prompt, llm_kwargs=self.llm_kwargs or {})
+        return chain, base_prompt
+
+    def _sampling_temperature(self):
+        """The temperature calls are made at, from llm_kwargs or else the LLM itself"""
+        return (self.llm_kwargs or {}).get("generation_config", {}).get(
+            "temperature", getattr(self.llm, "temperature", None)
+        )
+
+    def _cache_key(self, context, base_prompt):
+        """Return the response cache key, or None when sampling makes the reply too variable"""
+        llm_kwargs = self.llm_kwargs or {}
+        temperature = self._sampling_temperature()
+        if not llm_cache.is_cacheable(temperature):
+            return None
+        return llm_cache.make_key(
+            str(getattr(self.llm, "model", "")), str(temperature), repr(llm_kwargs),
+            self.role, str(context), base_prompt
+        )
+
+    def _is_usable_output(self, text):
+        """
+        Whether a reply is good enough to cache. Unusable replies are not
+        stored, so retries and reruns ask the LLM again; agents expecting
+        something other than a JSON object override this.
+        """
+        return self._extract_json_from_text(text) is not None
+
+    def get_output(self):
+        chain, base_prompt = self._build_chain()
+        key = self._cache_key(self.context, base_prompt)
+        if key:
+            cached = llm_cache.get_response(key)
+            if cached is not None:
+                return cached
+
+        text = chain.invoke({
             "role": self.role,
             "context": self.context,
             "base_prompt": base_prompt
         })['text']
+        if key and self._is_usable_output(text):
+            llm_cache.put_response(key, text)
+        return text
+
+    def get_outputs(self, contexts, max_concurrency=8):
+        """
+        Run the task once per context, sending the LLM calls as one batch.
+
+        Args:
+            contexts (list): Context strings, one per call
+            max_concurrency (int): Maximum number of requests in flight
+
+        Returns:
+            list: Response text per context, or the exception raised for it
+        """
+        if not contexts:
+            return []
+
+        chain, base_prompt = self._build_chain()
+        keys = [self._cache_key(context, base_prompt) for context in contexts]
+        outputs = [llm_cache.get_response(key) if key else None for key in keys]
+        pending = [i for i, output in enumerate(outputs) if output is None]
+        if not pending:
+            return outputs
+
+        results = chain.batch(
+            [
+                {"role": self.role, "context": contexts[i], "base_prompt": base_prompt}
+                for i in pending
+            ],
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True
+        )
+        for i, result in zip(pending, results):
+            if isinstance(result, Exception):
+                outputs[i] = result
+            else:
+                outputs[i] = result['text']
+                if keys[i] and self._is_usable_output(outputs[i]):
+                    llm_cache.put_response(keys[i], outputs[i])
+        return outputs
         
+    @staticmethod
+    def _extract_json_from_text(text):
+        """Extract JSON from text that may contain other content"""
+        json_match = _FENCED_JSON_RE.search(text)
+        if json_match:
+            try:
+                return json.loads(json_match.group(1))
+            except ValueError:
+                pass
+
+        # Otherwise decode the first JSON object, scanning forward from each '{'
+        start = text.find('{')
+        while start != -1:
+            try:
+                parsed, _ = _JSON_DECODER.raw_decode(text, start)
+                return parsed
+            except ValueError:
+                start = text.find('{', start + 1)
+        return None
+
     def calculate_score(self, metrics):
         """
         Calculate a score based on evaluation metrics.
@@ -93,7 +199,12 @@ class BaseAgent:
         if not metrics:
             return 0
             
-        total_weight = sum(metric.get('weight', 1) for metric in metrics.values())
-        weighted_sum = sum(metric['score'] * metric.get('weight', 1) for metric in metrics.values())
+        # One pass accumulates both totals
+        total_weight = 0
+        weighted_sum = 0
+        for metric in metrics.values():
+            weight = metric.get('weight', 1)
+            total_weight += weight
+            weighted_sum += metric['score'] * weight
         
         return (weighted_sum / total_weight) * 10  # Scale to 0-100
\ No newline at end of file
@@ -0,0 +1,103 @@
+import os
+import time
+import json
+import hashlib
+from config_loader import load_config
+
+
+# Default lifetime of a checkpoint, in seconds
+DEFAULT_TTL = 7 * 24 * 3600
+
+
+def _settings():
+    """Return the [checkpoint] settings, or None when checkpoints are disabled"""
+    settings = load_config().get("checkpoint", {})
+    return settings if settings.get("enabled", False) else None
+
+
+def _checkpoint_dir(settings):
+    return os.path.join(os.path.dirname(__file__), settings.get("path", ".qa_checkpoints"))
+
+
+def _expired(settings, path):
+    """Whether the file at path is older than the checkpoint ttl (0 = never expires)"""
+    ttl = settings.get("ttl", DEFAULT_TTL)
+    return bool(ttl) and time.time() - os.path.getmtime(path) >= ttl
+
+
+def _sweep(settings, directory):
+    """Delete expired checkpoints left behind by runs that never completed"""
+    try:
+        with os.scandir(directory) as it:
+            paths = [entry.path for entry in it if entry.is_file()]
+    except OSError:
+        return
+    for path in paths:
+        try:
+            if _expired(settings, path):
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def make_run_key(repo_url, commit_sha):
+    """Identify one evaluated commit of one repository"""
+    return hashlib.sha256(f"{repo_url}|{commit_sha}".encode("utf-8")).hexdigest()
+
+
+def fingerprint(*parts):
+    """Hash whatever a stage result depends on besides the commit (model, prompt)"""
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def _stage_path(directory, run_key, stage):
+    return os.path.join(directory, f"{run_key}-{stage}.json")
+
+
+def load_stage(run_key, stage, stage_fingerprint):
+    """Return a saved stage result, or None if absent, expired or made with another prompt/model"""
+    settings = _settings()
+    if not settings or not run_key:
+        return None
+    path = _stage_path(_checkpoint_dir(settings), run_key, stage)
+    try:
+        if _expired(settings, path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if saved.get("fingerprint") != stage_fingerprint:
+        return None
+    return saved.get("result")
+
+
+def save_stage(run_key, stage, stage_fingerprint, result):
+    """Persist a completed stage result, sweeping out expired checkpoints"""
+    settings = _settings()
+    if not settings or not run_key:
+        return
+    directory = _checkpoint_dir(settings)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        _sweep(settings, directory)
+        path = _stage_path(directory, run_key, stage)
+        # Written to a side file and renamed, so a crash never leaves half a checkpoint
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump({"fingerprint": stage_fingerprint, "result": result}, f, default=str)
+        os.replace(path + ".tmp", path)
+    except (OSError, TypeError, ValueError) as e:
+        print(f"Warning: Could not save {stage} checkpoint: {str(e)}")
+
+
+def clear_run(run_key, stages):
+    """Remove the checkpoints of a run once it has completed"""
+    settings = _settings()
+    if not settings or not run_key:
+        return
+    directory = _checkpoint_dir(settings)
+    for stage in stages:
+        try:
+            os.remove(_stage_path(directory, run_key, stage))
+        except OSError:
+            pass
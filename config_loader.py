@@ -1,8 +1,10 @@
 import os
+import functools
 import toml
 
+@functools.lru_cache(maxsize=1)
 def load_config():
-    """Load and return configuration from toml file"""
+    """Load and return configuration from toml file, parsed once per process"""
     config_path = os.path.join(os.path.dirname(__file__), "config.toml")
     try:
         config = toml.load(config_path)
@@ -12,8 +14,8 @@ def load_config():
         # Define minimal default configuration
         return {
             "general": {"default_model": "gemini-2.0-flash", "temp_cleanup": True},
-            "llm": {"temperature": 0.2, "max_tokens": 100000},
-            "weights": {"structure": 0.25, "content": 0.5, "simulation": 0.25},
+            "llm": {"temperature": 0.2, "max_tokens": 4096},
+            "weights": {"structure": 0.3, "content": 0.4, "browser_testing": 0.3},
             "thresholds": {
                 "structure_minimum": 3.0,
                 "template_penalty": 0.3,
@@ -0,0 +1,127 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from config_loader import load_config
+
+# Recently used responses, kept in-process so repeat prompts skip the database
+MEMORY_SIZE = 512
+_memory = OrderedDict()
+
+# Lookup counters for the life of the process
+stats = {"hits": 0, "misses": 0}
+
+# Agents run on several threads; _memory and stats are only touched under this
+_lock = threading.Lock()
+
+
+def _settings():
+    """Return the [llm_cache] settings, or None when caching is disabled"""
+    settings = load_config().get("llm_cache", {})
+    return settings if settings.get("enabled", False) else None
+
+
+def _cache_path(settings):
+    """Return the cache database path, or None for the in-memory backend"""
+    if settings.get("backend", "sqlite") == "memory":
+        return None
+    return os.path.join(os.path.dirname(__file__), settings.get("path", "llm_cache.sqlite"))
+
+
+def _fresh(settings, created):
+    ttl = settings.get("ttl", 0)
+    return not ttl or time.time() - created < ttl
+
+
+def _remember(key, response, created):
+    with _lock:
+        _memory[key] = (response, created)
+        _memory.move_to_end(key)
+        if len(_memory) > MEMORY_SIZE:
+            _memory.popitem(last=False)
+
+
+def is_cacheable(temperature):
+    """Whether replies sampled at this temperature may be cached"""
+    settings = _settings()
+    if not settings or temperature is None:
+        return False
+    return temperature <= settings.get("max_temperature", 0)
+
+
+def make_key(*parts):
+    """Hash everything that determines a response into a short key"""
+    return hashlib.blake2b("|".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _lookup(settings, key):
+    with _lock:
+        entry = _memory.get(key)
+        if entry is not None:
+            if _fresh(settings, entry[1]):
+                _memory.move_to_end(key)
+                return entry[0]
+            del _memory[key]
+    path = _cache_path(settings)
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        conn = sqlite3.connect(path)
+        try:
+            row = conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Warning: Could not read LLM cache: {str(e)}")
+        return None
+    if not row or not _fresh(settings, row[1]):
+        return None
+    _remember(key, row[0], row[1])
+    return row[0]
+
+
+def get_response(key):
+    """Return the cached LLM response for this key, if any and not expired"""
+    settings = _settings()
+    if not settings:
+        return None
+    response = _lookup(settings, key)
+    with _lock:
+        stats["hits" if response is not None else "misses"] += 1
+    return response
+
+
+def get_stats():
+    """Return a snapshot of the hit and miss counters"""
+    with _lock:
+        return dict(stats)
+
+
+def put_response(key, response):
+    """Store an LLM response under its key"""
+    settings = _settings()
+    if not settings:
+        return
+    created = time.time()
+    _remember(key, response, created)
+    path = _cache_path(settings)
+    if not path:
+        return
+    try:
+        conn = sqlite3.connect(path)
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created) VALUES (?, ?, ?)",
+                (key, response, created)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Warning: Could not write LLM cache: {str(e)}")
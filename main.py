@@ -1,8 +1,15 @@
 import os
+import uuid
+import atexit
+import functools
 import shutil
 import tempfile
 import re
 import subprocess
+import threading
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from git import Repo, GitCommandError
 from langchain_google_genai import ChatGoogleGenerativeAI
 from Agents.PlaywrightTestingAgent import PlaywrightTestingAgent
@@ -11,20 +18,76 @@ from Agents.ContentEvaluationAgent import ContentEvaluationAgent
 from Agents.ScoreCalculationAgent import ScoreCalculationAgent
 from Agents.RepositoryAgent import RepositoryAgent
 from config_loader import load_config
+from repo_index import RepoIndex
+import checkpoint
+import llm_cache
 
-# Load the configuration
-CONFIG = load_config()
+@functools.lru_cache(maxsize=8)
+def _llm(model, temperature):
+    """Return a shared Gemini client, so new pipelines reuse its connection"""
+    settings = load_config().get("llm", {})
+    return ChatGoogleGenerativeAI(
+        model=model,
+        temperature=temperature,
+        # Rate-limited and timed-out calls are retried with exponential backoff
+        max_retries=settings.get("max_retries", 6),
+        timeout=settings.get("timeout", 120),
+        # Every agent asks for a short JSON reply; the cap stops runaway output
+        max_output_tokens=settings.get("max_tokens", 4096),
+    )
+
+# Directories still being deleted in the background, joined at exit
+_pending_deletes = []
+# Set once exit handlers run; threads started after that never get to run
+_exiting = threading.Event()
+
+def _discard_directory(path):
+    """Delete a directory without making the caller wait for it"""
+    # Renaming first frees the path at once; the walk and unlinks happen later
+    trash = f"{path}.trash-{uuid.uuid4().hex}"
+    try:
+        os.rename(path, trash)
+    except OSError:
+        trash = path
+    if _exiting.is_set():
+        # Pipelines collected at interpreter shutdown delete in place
+        shutil.rmtree(trash, ignore_errors=True)
+        return
+    try:
+        thread = threading.Thread(
+            target=shutil.rmtree, args=(trash,), kwargs={"ignore_errors": True}, daemon=True
+        )
+        thread.start()
+    except RuntimeError:
+        shutil.rmtree(trash, ignore_errors=True)
+        return
+    _pending_deletes[:] = [t for t in _pending_deletes if t.is_alive()]
+    _pending_deletes.append(thread)
+
+@atexit.register
+def _finish_deletes():
+    _exiting.set()
+    for thread in _pending_deletes:
+        thread.join()
+
+# Prompts behind each checkpointed stage; editing one invalidates its checkpoints
+_STAGE_PROMPTS = {
+    "repository": RepositoryAgent.basic_prompt_template,
+    "structure": StructureComplianceAgent.basic_prompt_template,
+    "content": ContentEvaluationAgent.evaluation_prompt_template,
+    "browser_testing": PlaywrightTestingAgent.test_planning_prompt
+}
 
 class QAPipeline:
     def __init__(self, model="gemini-1.5-flash", custom_weights=None):
         self.model = model
-        self.llm = ChatGoogleGenerativeAI(
-            model=self.model,
-            temperature=0.1,
-            # google_api_key=CONFIG["general"]["api_key"]
-        )
+        self.llm = _llm(self.model, 0.1)
         self.temp_dir = None
         self.repo_url = None
+        # Identifies the cloned commit for stage checkpoints
+        self.run_key = None
+        # Set when a stage of the current evaluation fell back to placeholder results
+        self.degraded = False
         self.evaluation_results = {}
         self.final_score = 0
         self.report = ""
@@ -59,13 +122,11 @@ class QAPipeline:
             
             # Parse branch names from output
             branches = []
-            for line in result.stdout.strip().split('\n'):
-                if line:
-                    # Extract branch name from "hash refs/heads/branch-name"
-                    parts = line.split('\t')
-                    if len(parts) == 2 and 'refs/heads/' in parts[1]:
-                        branch_name = parts[1].replace('refs/heads/', '')
-                        branches.append(branch_name)
+            for line in result.stdout.splitlines():
+                # Extract branch name from "hash\trefs/heads/branch-name"
+                _, tab, ref = line.partition('\t')
+                if tab and ref.startswith('refs/heads/'):
+                    branches.append(ref[len('refs/heads/'):])
             
             if not branches:
                 return False, "No branches found"
@@ -91,39 +152,61 @@ class QAPipeline:
     def clone_repository(self, repo_url, branch="main"):
         """Clone the repository to a temporary directory"""
         try:
-            if self.temp_dir and os.path.exists(self.temp_dir):
-                shutil.rmtree(self.temp_dir)
+            if self.temp_dir:
+                # The new clone does not wait on the previous checkout's deletion
+                _discard_directory(self.temp_dir)
             
             self.temp_dir = tempfile.mkdtemp()
             self.repo_url = repo_url
+            self.run_key = None
             
-            # Clone with specific branch
-            Repo.clone_from(repo_url, self.temp_dir, branch=branch, depth=1)
+            # Shallow clone of just this branch; only the working tree is read
+            repo = Repo.clone_from(repo_url, self.temp_dir, branch=branch, depth=1)
+            self.run_key = checkpoint.make_run_key(repo_url, repo.head.commit.hexsha)
             
             return True, f"Repository cloned successfully to {self.temp_dir}"
         except GitCommandError as e:
             error_msg = str(e)
-            if "does not exist" in error_msg or "not found" in error_msg:
+            # Only git's missing-branch message; "Repository not found" and
+            # other failures keep their own error
+            if f"Remote branch {branch} not found" in error_msg:
+                if branch == "main":
+                    # Older labs still use master as their default branch
+                    success, message = self.clone_repository(repo_url, "master")
+                    if success or message != "Branch 'master' not found in repository":
+                        return success, message
                 return False, f"Branch '{branch}' not found in repository"
             else:
                 return False, f"Git error: {error_msg}"
         except Exception as e:
             return False, f"Failed to clone repository: {str(e)}"
 
-    def evaluate_repository(self):
-        """Run the complete evaluation pipeline"""
-        if not self.temp_dir or not os.path.exists(self.temp_dir):
-            return False, "Repository not cloned yet."
+    def _load_stage(self, stage):
+        """Return the checkpointed result of a stage for this commit, if any"""
+        return checkpoint.load_stage(
+            self.run_key, stage, checkpoint.fingerprint(self.model, _STAGE_PROMPTS[stage])
+        )
+
+    def _save_stage(self, stage, result):
+        checkpoint.save_stage(
+            self.run_key, stage, checkpoint.fingerprint(self.model, _STAGE_PROMPTS[stage]), result
+        )
 
-        # Step 1: Repository metadata analysis
+    def _analyze_repository(self):
+        """Step 1: Repository metadata analysis"""
+        saved = self._load_stage("repository")
+        if saved is not None:
+            return saved
         try:
             repo_agent = RepositoryAgent(repo_path=self.temp_dir, repo_url=self.repo_url)
             repo_agent.set_llm(self.llm)
             repo_results = repo_agent.get_output()
-            self.evaluation_results['repository'] = repo_results
+            self._save_stage("repository", repo_results)
+            return repo_results
         except Exception as e:
             print(f"Warning: Repository analysis failed: {str(e)}")
-            self.evaluation_results['repository'] = {
+            self.degraded = True
+            return {
                 "experiment_name": "Unknown Experiment",
                 "experiment_overview": "Repository analysis failed",
                 "enhanced_overview": "Could not analyze repository metadata",
@@ -131,36 +214,100 @@ class QAPipeline:
                 "subject_area": "Unknown"
             }
 
-        # Step 2: Structure compliance evaluation
-        try:
-            structure_agent = StructureComplianceAgent(self.temp_dir)
-            structure_agent.set_llm(self.llm)
-            structure_results = structure_agent.get_output()
-            self.evaluation_results['structure'] = structure_results
-            
-            if structure_results['compliance_score'] < CONFIG["thresholds"]["structure_minimum"]:
-                return False, "Repository structure does not meet minimum requirements."
-                
-        except Exception as e:
-            return False, f"Structure evaluation failed: {str(e)}"
+    def _evaluate_structure(self, repo_index, on_checks_passed=None):
+        """
+        Step 2: Structure compliance evaluation, returning (results, error message).
+
+        on_checks_passed is called as soon as the deterministic checks clear the
+        minimum score, before the structure LLM call, so dependent steps can
+        start alongside it.
+        """
+        minimum = load_config()["thresholds"]["structure_minimum"]
+        structure_results = self._load_stage("structure")
+        if structure_results is None:
+            try:
+                structure_agent = StructureComplianceAgent(self.temp_dir, repo_index=repo_index)
+                structure_agent.set_llm(self.llm)
+                if on_checks_passed and structure_agent.check_compliance()[3] >= minimum:
+                    on_checks_passed()
+                structure_results = structure_agent.get_output()
+            except Exception as e:
+                return None, f"Structure evaluation failed: {str(e)}"
+            self._save_stage("structure", structure_results)
+        elif on_checks_passed and structure_results['compliance_score'] >= minimum:
+            on_checks_passed()
+
+        if structure_results['compliance_score'] < minimum:
+            return structure_results, "Repository structure does not meet minimum requirements."
+        return structure_results, None
 
-        # Step 3: Content evaluation
+    def _evaluate_content(self, repo_index):
+        """Step 3: Content evaluation, returning (results, error message)"""
+        saved = self._load_stage("content")
+        if saved is not None:
+            return saved, None
         try:
-            content_agent = ContentEvaluationAgent(self.temp_dir)
+            content_agent = ContentEvaluationAgent(self.temp_dir, repo_index=repo_index)
             content_agent.set_llm(self.llm)
             content_results = content_agent.get_output()
-            self.evaluation_results['content'] = content_results
         except Exception as e:
-            return False, f"Content evaluation failed: {str(e)}"
+            return None, f"Content evaluation failed: {str(e)}"
+        self._save_stage("content", content_results)
+        return content_results, None
 
-        # Step 4: Browser functionality testing (replaces simulation evaluation)
+    def evaluate_repository(self):
+        """Run the complete evaluation pipeline"""
+        if not self.temp_dir or not os.path.exists(self.temp_dir):
+            return False, "Repository not cloned yet."
+
+        self.degraded = False
+        # Walk the checkout once; the agents below share the result
+        repo_index = RepoIndex(self.temp_dir)
+
+        # Steps 1-3 only read the checkout, so their LLM calls overlap: the
+        # repository step runs in the background from the start, and content
+        # evaluation joins it once the deterministic structure checks pass,
+        # alongside the structure LLM call. Failing repositories never start it.
+        content_futures = []
+        pool = ThreadPoolExecutor(max_workers=2)
         try:
-            playwright_agent = PlaywrightTestingAgent(self.temp_dir)
-            playwright_agent.set_llm(self.llm)
-            playwright_results = playwright_agent.get_output()
+            repository_future = pool.submit(self._analyze_repository)
+            structure_results, structure_error = self._evaluate_structure(
+                repo_index,
+                on_checks_passed=lambda: content_futures.append(
+                    pool.submit(self._evaluate_content, repo_index)
+                )
+            )
+            self.evaluation_results['repository'] = repository_future.result()
+
+            if structure_results is not None:
+                self.evaluation_results['structure'] = structure_results
+            if structure_error:
+                return False, structure_error
+
+            content_results, content_error = content_futures[0].result()
+        finally:
+            # A content step already running when structure evaluation failed
+            # is left to finish on its own rather than waited for
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        if content_error:
+            return False, content_error
+        self.evaluation_results['content'] = content_results
+
+        # Step 4: Browser functionality testing (replaces simulation evaluation).
+        # Kept on its own so concurrent work cannot skew the Lighthouse timings
+        try:
+            playwright_results = self._load_stage("browser_testing")
+            if playwright_results is None:
+                playwright_agent = PlaywrightTestingAgent(self.temp_dir, repo_index=repo_index)
+                playwright_agent.set_llm(self.llm)
+                playwright_results = playwright_agent.get_output()
+                self._save_stage("browser_testing", playwright_results)
             self.evaluation_results['browser_testing'] = playwright_results
         except Exception as e:
             print(f"Warning: Browser testing failed: {str(e)}")
+            self.degraded = True
             self.evaluation_results['browser_testing'] = {
                 "browser_score": 0,
                 "status": "ERROR",
@@ -179,12 +326,14 @@ class QAPipeline:
             score_agent = ScoreCalculationAgent(self.evaluation_results, self.weights)
             score_agent.set_llm(self.llm)
             score_results = score_agent.get_output()
+            self.degraded = self.degraded or score_agent.degraded
             
             self.final_score = score_results['final_score']
             self.report = score_results['report']
             self.evaluation_results.update(score_results)
         except Exception as e:
             print(f"Warning: Score calculation failed: {str(e)}")
+            self.degraded = True
             # Provide fallback scoring
             structure_score = self.evaluation_results.get('structure', {}).get('compliance_score', 0) * 10
             content_score = self.evaluation_results.get('content', {}).get('average_score', 0) * 10
@@ -203,6 +352,10 @@ class QAPipeline:
                 'report': self.report
             })
 
+        # Checkpoints only exist to resume a run that did not finish cleanly;
+        # after a fallback they let a rerun skip the stages that did succeed
+        if not self.degraded:
+            checkpoint.clear_run(self.run_key, _STAGE_PROMPTS)
         return True, "Evaluation completed successfully."
 
     def get_results(self):
@@ -232,10 +385,81 @@ class QAPipeline:
         
         return self.evaluation_results
 
+    @classmethod
+    def evaluate_batch(cls, repo_urls, branch="main", max_concurrency=4, **pipeline_kwargs):
+        """
+        Evaluate several repositories, one pipeline each.
+
+        Clones run in the background, at most max_concurrency ahead of the
+        evaluations, which run one by one in input order, each starting as
+        soon as its clone is ready. Evaluations are not overlapped with each
+        other, so browser testing and Lighthouse never compete with another
+        simulation; clones of upcoming repositories may still be running in
+        the background while they measure. A repository that raises is
+        reported as failed without stopping the rest of the batch.
+
+        Args:
+            repo_urls (iterable): Repository URLs to evaluate
+            branch (str): Branch to clone in every repository
+            max_concurrency (int): Maximum number of clones ahead of evaluation
+            **pipeline_kwargs: Passed to each QAPipeline (model, custom_weights)
+
+        Returns:
+            list: One dict per URL with repo_url, success, message and results
+        """
+        def clone(repo_url):
+            pipeline = cls(**pipeline_kwargs)
+            try:
+                return pipeline, pipeline.clone_repository(repo_url, branch)
+            except Exception:
+                pipeline.cleanup()
+                raise
+
+        # Walked twice below (clone prefetch and evaluation), so materialize
+        # it in case a generator was passed
+        repo_urls = list(repo_urls)
+        outcomes = []
+        with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+            # Clones are submitted as evaluation advances, so at most
+            # max_concurrency checkouts sit on disk ahead of the evaluator
+            futures = deque()
+            upcoming = iter(repo_urls)
+            for repo_url in itertools.islice(upcoming, max_concurrency):
+                futures.append(pool.submit(clone, repo_url))
+
+            for repo_url in repo_urls:
+                future = futures.popleft()
+                for next_url in itertools.islice(upcoming, 1):
+                    futures.append(pool.submit(clone, next_url))
+
+                pipeline = None
+                results = None
+                try:
+                    pipeline, (success, message) = future.result()
+                    if success:
+                        success, message = pipeline.evaluate_repository()
+                    if success:
+                        results = pipeline.get_results()
+                except Exception as e:
+                    success, message = False, f"Evaluation failed: {str(e)}"
+                finally:
+                    if pipeline is not None:
+                        pipeline.cleanup()
+                outcomes.append({
+                    "repo_url": repo_url,
+                    "success": success,
+                    "message": message,
+                    "results": results
+                })
+        return outcomes
+
     def cleanup(self):
         """Clean up temporary files"""
-        if self.temp_dir and os.path.exists(self.temp_dir):
-            shutil.rmtree(self.temp_dir)
+        # getattr: __del__ may run on an instance whose __init__ failed early
+        temp_dir = getattr(self, 'temp_dir', None)
+        if temp_dir:
+            self.temp_dir = None
+            _discard_directory(temp_dir)
 
     def __del__(self):
         self.cleanup()
@@ -267,3 +491,6 @@ if __name__ == "__main__":
                 print(f"Structure: {component_scores.get('structure', 0):.1f}/100")
                 print(f"Content: {component_scores.get('content', 0):.1f}/100")
                 print(f"Browser Testing: {component_scores.get('browser_testing', 0):.1f}/100")
+
+            cache_stats = llm_cache.get_stats()
+            print(f"LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
@@ -0,0 +1,101 @@
+import os
+
+
+class RepoIndex:
+    """
+    One os.scandir walk of a cloned repository, shared by the agents.
+
+    listings maps each relative directory to its sorted [(name, is_dir)]
+    entries, or to an error string when it could not be read. dirs and
+    files hold every relative path found. Relative paths use '/'
+    separators, and .git*/node_modules entries are never indexed.
+    """
+
+    def __init__(self, repo_path):
+        self.repo_path = repo_path
+        self.listings = {}
+        self.dirs = set()
+        self.files = set()
+        self._walk()
+
+    @staticmethod
+    def _skipped(name):
+        return name.startswith('.git') or name == 'node_modules'
+
+    def _walk(self):
+        pending = [("", self.repo_path)]
+        while pending:
+            relative_dir, path = pending.pop()
+            try:
+                with os.scandir(path) as it:
+                    dir_entries = sorted(it, key=lambda entry: entry.name)
+            except OSError as e:
+                self.listings[relative_dir] = f"Error accessing {path}: {str(e)}"
+                continue
+
+            listing = []
+            for entry in dir_entries:
+                if self._skipped(entry.name):
+                    continue
+
+                relative_path = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+                try:
+                    is_dir = entry.is_dir()
+                    listing.append((entry.name, is_dir))
+                    if is_dir:
+                        self.dirs.add(relative_path)
+                        # Symlinked directories are listed but not entered, so
+                        # a link cycle cannot make the walk run forever
+                        if not entry.is_symlink():
+                            pending.append((relative_path, entry.path))
+                    elif entry.is_file():
+                        self.files.add(relative_path)
+                except OSError:
+                    continue
+
+            self.listings[relative_dir] = listing
+
+    def full_path(self, relative_path):
+        return os.path.join(self.repo_path, *relative_path.split('/'))
+
+    def is_file(self, relative_path):
+        return relative_path in self.files
+
+    def is_dir(self, relative_path):
+        return relative_path in self.dirs
+
+    def size(self, relative_path):
+        """Return the file size in bytes, or None if it cannot be read"""
+        try:
+            return os.path.getsize(self.full_path(relative_path))
+        except OSError:
+            return None
+
+    def iter_files(self, relative_dir, skip_dirs=()):
+        """
+        Yield the indexed files under relative_dir, depth first in listing
+        order, without entering directories named in skip_dirs.
+        """
+        listing = self.listings.get(relative_dir)
+        if not isinstance(listing, list):
+            return
+        for name, is_dir in listing:
+            relative_path = f"{relative_dir}/{name}" if relative_dir else name
+            if not is_dir:
+                if relative_path in self.files:
+                    yield relative_path
+            elif name not in skip_dirs:
+                yield from self.iter_files(relative_path, skip_dirs)
+
+    def read(self, relative_path, max_chars=None):
+        """
+        Return the text of an indexed file, or None if it is not in the index
+        or cannot be decoded. max_chars caps how much of the file is read.
+        """
+        if relative_path not in self.files:
+            return None
+        try:
+            with open(self.full_path(relative_path), 'r', encoding='utf-8') as f:
+                return f.read() if max_chars is None else f.read(max_chars)
+        except (OSError, UnicodeDecodeError):
+            return None
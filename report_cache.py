@@ -0,0 +1,103 @@
+import os
+import time
+import sqlite3
+import hashlib
+from collections import OrderedDict
+from config_loader import load_config
+
+# Stored reports keep this slot where the experiment name appeared
+NAME_PLACEHOLDER = "{{experiment_name}}"
+
+# Recently used reports, kept in-process so repeat runs skip the database
+MEMORY_SIZE = 256
+_memory = OrderedDict()
+
+
+def _settings():
+    """Return the [report_cache] settings, or None when caching is disabled"""
+    settings = load_config().get("report_cache", {})
+    return settings if settings.get("enabled", False) else None
+
+
+def _cache_path(settings):
+    return os.path.join(os.path.dirname(__file__), settings.get("path", "reports_cache.sqlite"))
+
+
+def _fresh(settings, created):
+    ttl = settings.get("ttl", 0)
+    return not ttl or time.time() - created < ttl
+
+
+def _remember(key, generalized_report, created):
+    _memory[key] = (generalized_report, created)
+    _memory.move_to_end(key)
+    if len(_memory) > MEMORY_SIZE:
+        _memory.popitem(last=False)
+
+
+def make_key(generalized_prompt, model, temperature):
+    """Hash the report prompt, rendered with NAME_PLACEHOLDER as the name, and the model settings"""
+    return hashlib.sha256(f"{model}|{temperature}|{generalized_prompt}".encode("utf-8")).hexdigest()
+
+
+def get_report(key, experiment_name):
+    """Return a cached, unexpired report for this key rendered for the experiment, if any"""
+    settings = _settings()
+    if not settings:
+        return None
+    if key in _memory:
+        report, created = _memory[key]
+        if _fresh(settings, created):
+            _memory.move_to_end(key)
+            return report.replace(NAME_PLACEHOLDER, experiment_name)
+        del _memory[key]
+    path = _cache_path(settings)
+    if not os.path.exists(path):
+        return None
+    try:
+        conn = sqlite3.connect(path)
+        try:
+            row = conn.execute(
+                "SELECT report, created FROM reports_v2 WHERE key = ?", (key,)
+            ).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Warning: Could not read report cache: {str(e)}")
+        return None
+    if not row or not _fresh(settings, row[1]):
+        return None
+    _remember(key, row[0], row[1])
+    return row[0].replace(NAME_PLACEHOLDER, experiment_name)
+
+
+def put_report(key, report, experiment_name):
+    """Store a generated report with the experiment name factored out"""
+    settings = _settings()
+    if not settings:
+        return
+    # The report template puts the name in one slot. If it shows up anywhere
+    # else too (a common word, or prose about this experiment), the slot
+    # cannot be told apart, so the report is not reused for other experiments
+    if not experiment_name or report.count(experiment_name) != 1:
+        return
+    generalized = report.replace(experiment_name, NAME_PLACEHOLDER)
+    created = time.time()
+    _remember(key, generalized, created)
+    try:
+        conn = sqlite3.connect(_cache_path(settings))
+        try:
+            # reports_v2: rows of the old reports table were keyed without the model
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS reports_v2 "
+                "(key TEXT PRIMARY KEY, report TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO reports_v2 (key, report, created) VALUES (?, ?, ?)",
+                (key, generalized, created)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Warning: Could not write report cache: {str(e)}")